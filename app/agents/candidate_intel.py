@@ -22,7 +22,7 @@ def extract_job_role(jd_text: str) -> str:
     """
 
     # Normalize text
-    lines = [line.strip() for line in jd_text.splitlines() if line.strip()]
+    lines = [s for s in (line.strip() for line in jd_text.splitlines()) if s]
 
     if not lines:
         raise ValueError("JD text is empty. Cannot extract job role.")
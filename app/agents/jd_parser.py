@@ -15,7 +15,7 @@ def _extract_section(text: str, start: str, stop_keywords: List[str]) -> str:
 
 def _extract_bullets(section_text: str) -> List[str]:
     bullets = re.findall(r"[•\-]\s*(.+)", section_text)
-    return [b.strip() for b in bullets if b.strip()]
+    return [s for s in (b.strip() for b in bullets) if s]
 
 # ----------------------------
 # LLM prompt (EXTRACTION ONLY)
@@ -46,7 +46,7 @@ def jd_parser(state: Dict) -> Dict:
     text = state["jd_text"]
 
     # --------- Regex-based extraction ---------
-    lines = [l.strip() for l in text.splitlines() if l.strip()]
+    lines = [s for s in (line.strip() for line in text.splitlines()) if s]
     role = lines[0] if lines else None
 
     location = re.search(r"Location:\s*(.+)", text, re.IGNORECASE)
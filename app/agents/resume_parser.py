@@ -3,8 +3,8 @@ import os
 import zipfile
 from typing import Dict, List
 
-from app.utils.text_cleanup import extract_text_from_file
-from app.utils.resume_skills import extract_skills_llm, extract_section
+from app.utils.text_cleanup import extract_text_from_file, extract_texts_from_dir
+from app.utils.resume_skills import extract_skills_bulk, extract_section
 
 
 SUPPORTED_EXT = (".pdf", ".doc", ".docx", ".txt")
@@ -26,17 +26,13 @@ def _extract_resumes_from_files(resume_files: List[str]) -> List[Dict]:
             with zipfile.ZipFile(path, "r") as z:
                 z.extractall(extract_dir)
 
-            for root, _, files in os.walk(extract_dir):
-                for f in files:
-                    if f.lower().endswith(SUPPORTED_EXT):
-                        full_path = os.path.join(root, f)
-                        text = extract_text_from_file(full_path)
-                        if text.strip():
-                            extracted.append({
-                                "file": f,
-                                "path": full_path,
-                                "text": text
-                            })
+            for full_path, text in extract_texts_from_dir(extract_dir):
+                if text.strip():
+                    extracted.append({
+                        "file": os.path.basename(full_path),
+                        "path": full_path,
+                        "text": text
+                    })
 
         # ---------------- SINGLE FILE ----------------
         else:
@@ -67,9 +63,15 @@ def resume_parser(state: Dict) -> Dict:
 
     raw_resumes = _extract_resumes_from_files(resume_files)
 
+    # One concurrent LLM batch for all resumes instead of a call per resume
+    skills = extract_skills_bulk(
+        [r["text"] for r in raw_resumes],
+        role_context=jd_role
+    )
+
     parsed_resumes = []
 
-    for r in raw_resumes:
+    for r, resume_skills in zip(raw_resumes, skills):
         text = r["text"]
 
         parsed_resumes.append({
@@ -77,10 +79,7 @@ def resume_parser(state: Dict) -> Dict:
             "summary": extract_section(
                 text, ["summary", "profile", "about"]
             ),
-            "skills": extract_skills_llm(
-                resume_text=text,
-                role_context=jd_role
-            ),
+            "skills": resume_skills,
             "experience": extract_section(
                 text, ["experience", "work history", "employment"]
             ),
@@ -14,7 +14,7 @@ from app.agents.persona_builder import build_personas
 from app.agents.cv_evaluator import evaluate_candidate
 from app.agents.candidate_ranker import rank_candidates
 from app.agents.resume_parser import _extract_resumes_from_files
-from app.utils.resume_skills import extract_skills_llm, extract_section
+from app.utils.resume_skills import extract_skills_bulk, extract_section
 
 router = APIRouter()
 
@@ -90,15 +90,17 @@ async def evaluate_cvs(
             }
 
         # Parse each resume into structured form
+        skills = extract_skills_bulk([r["text"] for r in raw_resumes])
+
         parsed_resumes = []
-        for r in raw_resumes:
+        for r, resume_skills in zip(raw_resumes, skills):
             text = r["text"]
             parsed_resumes.append({
                 "candidate_id": r["file"],
                 "summary": extract_section(
                     text, ["summary", "profile", "about", "objective"]
                 ),
-                "skills": extract_skills_llm(resume_text=text),
+                "skills": resume_skills,
                 "experience": extract_section(
                     text, ["experience", "work history", "employment"]
                 ),
@@ -193,15 +195,17 @@ async def full_cv_pipeline(
                 "shortlist": []
             }
 
+        skills = extract_skills_bulk([r["text"] for r in raw_resumes])
+
         parsed_resumes = []
-        for r in raw_resumes:
+        for r, resume_skills in zip(raw_resumes, skills):
             text = r["text"]
             parsed_resumes.append({
                 "candidate_id": r["file"],
                 "summary": extract_section(
                     text, ["summary", "profile", "about", "objective"]
                 ),
-                "skills": extract_skills_llm(resume_text=text),
+                "skills": resume_skills,
                 "experience": extract_section(
                     text, ["experience", "work history", "employment"]
                 ),
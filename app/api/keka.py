@@ -2,23 +2,38 @@
 # Keka Hire API Integration Router
 # Endpoints for importing jobs and candidates from Keka into the local system.
 
-from typing import Optional, List
+import asyncio
+import json
+from functools import lru_cache
+from typing import Optional, List, Tuple
 from datetime import datetime, timezone
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+import requests
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from sqlalchemy import insert, inspect
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
 
-from app.db.database import get_db
+from app.db.database import engine, get_db, SessionLocal
 from app.db.models import (
     JobRequest, JobStatus, Candidate, CandidateStage,
-    User, UserRole,
+    User, UserRole, ImportJob, ImportJobStatus,
 )
 from app.api.auth import get_current_user, require_role
-from app.utils.keka_client import get_keka_client, KekaAuthError, KekaAPIError
+from app.utils.keka_client import get_keka_client, KekaClient, KekaAuthError, KekaAPIError
 
 router = APIRouter(prefix="/keka", tags=["Keka Integration"])
 
+# Candidates are written to the DB in batches of this size while the
+# remaining Keka pages are still being fetched.
+IMPORT_BATCH_SIZE = 100
+
+# How often the import-status stream re-reads the import job row.
+IMPORT_STATUS_POLL_SECONDS = 1.0
+
 
 # ── Response Schemas ──────────────────────────────────
 
@@ -44,11 +59,9 @@ class KekaCandidateOut(BaseModel):
     has_resume: bool = False
 
 
-class ImportResult(BaseModel):
-    imported: int
-    skipped: int
-    errors: List[str]
-    candidates: List[dict]
+class ImportJobOut(BaseModel):
+    job_id: int
+    status: str
 
 
 class ConnectionStatus(BaseModel):
@@ -61,8 +74,11 @@ class ConnectionStatus(BaseModel):
 
 # ── Helper ────────────────────────────────────────────
 
-def _get_client():
-    """Get KekaClient or raise a clear HTTP error."""
+def _get_client(request: Request) -> KekaClient:
+    """Get the shared KekaClient or raise a clear HTTP error."""
+    client = getattr(request.app.state, "keka_client", None)
+    if client is not None:
+        return client
     try:
         return get_keka_client()
     except ValueError as e:
@@ -72,6 +88,32 @@ def _get_client():
         )
 
 
+# Keka uses different field names across endpoints; each tuple lists
+# the aliases to try, in order of preference.
+_TITLE_KEYS = ("title", "jobTitle")
+_DEPARTMENT_KEYS = ("department", "departmentName")
+_LOCATION_KEYS = ("location", "locationName")
+_CREATED_ON_KEYS = ("createdOn", "createdDate")
+_POSITIONS_KEYS = ("noOfPositions", "positions")
+_FIRST_NAME_KEYS = ("firstName", "first_name")
+_LAST_NAME_KEYS = ("lastName", "last_name")
+_EMAIL_KEYS = ("email", "emailAddress")
+_PHONE_KEYS = ("phone", "mobileNumber")
+_STAGE_KEYS = ("stage", "currentStage")
+_SOURCE_KEYS = ("source", "candidateSource")
+_APPLIED_ON_KEYS = ("appliedOn", "appliedDate")
+_RESUME_KEYS = ("hasResume", "resumeId")
+
+
+def _first(record: dict, keys: Tuple[str, ...], default=None):
+    """Return the first non-None value among `keys` in a Keka record."""
+    for key in keys:
+        value = record.get(key)
+        if value is not None:
+            return value
+    return default
+
+
 def _map_keka_stage(keka_stage: str) -> CandidateStage:
     """Map Keka candidate stage names to our CandidateStage enum."""
     mapping = {
@@ -97,21 +139,25 @@ def _map_keka_stage(keka_stage: str) -> CandidateStage:
 
 @router.get("/test-connection", response_model=ConnectionStatus)
 def test_keka_connection(
+    request: Request,
     current_user: User = Depends(require_role(UserRole.hr)),
 ):
     """Test the connection to Keka API."""
-    client = _get_client()
+    client = _get_client(request)
     result = client.test_connection()
-    return ConnectionStatus(**result)
+    # test_connection() already returns the right shape; skip re-validation
+    # here since FastAPI validates against response_model on the way out
+    return ConnectionStatus.model_construct(**result)
 
 
 @router.get("/jobs", response_model=List[KekaJobOut])
 def list_keka_jobs(
+    request: Request,
     status: Optional[str] = Query(None, description="Filter by job status"),
     current_user: User = Depends(require_role(UserRole.hr)),
 ):
     """Fetch all jobs from Keka Hire."""
-    client = _get_client()
+    client = _get_client(request)
 
     try:
         raw_jobs = client.get_jobs(status=status)
@@ -124,12 +170,12 @@ def list_keka_jobs(
     for j in raw_jobs:
         jobs.append(KekaJobOut(
             id=str(j.get("id", "")),
-            title=j.get("title", j.get("jobTitle", "Untitled")),
-            department=j.get("department", j.get("departmentName", None)),
-            location=j.get("location", j.get("locationName", None)),
+            title=_first(j, _TITLE_KEYS, "Untitled"),
+            department=_first(j, _DEPARTMENT_KEYS),
+            location=_first(j, _LOCATION_KEYS),
             status=j.get("status", None),
-            created_on=j.get("createdOn", j.get("createdDate", None)),
-            positions=j.get("noOfPositions", j.get("positions", None)),
+            created_on=_first(j, _CREATED_ON_KEYS),
+            positions=_first(j, _POSITIONS_KEYS),
         ))
 
     return jobs
@@ -137,33 +183,32 @@ def list_keka_jobs(
 
 @router.get("/jobs/{keka_job_id}/candidates", response_model=List[KekaCandidateOut])
 def list_keka_candidates(
+    request: Request,
     keka_job_id: str,
     current_user: User = Depends(require_role(UserRole.hr)),
 ):
     """Fetch all candidates for a Keka job."""
-    client = _get_client()
+    client = _get_client(request)
 
+    candidates = []
     try:
-        raw_candidates = client.get_candidates(keka_job_id)
+        for c in client.get_candidates(keka_job_id):
+            candidates.append(KekaCandidateOut(
+                id=str(c.get("id", "")),
+                first_name=_first(c, _FIRST_NAME_KEYS),
+                last_name=_first(c, _LAST_NAME_KEYS),
+                email=_first(c, _EMAIL_KEYS),
+                phone=_first(c, _PHONE_KEYS),
+                stage=_first(c, _STAGE_KEYS),
+                source=_first(c, _SOURCE_KEYS),
+                applied_on=_first(c, _APPLIED_ON_KEYS),
+                has_resume=bool(_first(c, _RESUME_KEYS, False)),
+            ))
     except KekaAuthError as e:
         raise HTTPException(status_code=401, detail=str(e))
     except KekaAPIError as e:
         raise HTTPException(status_code=e.status_code or 502, detail=str(e))
 
-    candidates = []
-    for c in raw_candidates:
-        candidates.append(KekaCandidateOut(
-            id=str(c.get("id", "")),
-            first_name=c.get("firstName", c.get("first_name", None)),
-            last_name=c.get("lastName", c.get("last_name", None)),
-            email=c.get("email", c.get("emailAddress", None)),
-            phone=c.get("phone", c.get("mobileNumber", None)),
-            stage=c.get("stage", c.get("currentStage", None)),
-            source=c.get("source", c.get("candidateSource", None)),
-            applied_on=c.get("appliedOn", c.get("appliedDate", None)),
-            has_resume=bool(c.get("hasResume", c.get("resumeId", False))),
-        ))
-
     return candidates
 
 
@@ -172,127 +217,398 @@ class ImportCandidatesRequest(BaseModel):
     candidate_ids: Optional[List[str]] = None  # Specific Keka candidate IDs (None = all)
 
 
-@router.post("/import-candidates/{keka_job_id}", response_model=ImportResult)
+def _attach_resumes(client: KekaClient, rows: List[dict], keka_ids: List[str]):
+    """Check a batch's resumes concurrently and fill in resume_text."""
+    try:
+        has_resume = client.bulk_has_resumes(keka_ids)
+    except (KekaAPIError, requests.RequestException):
+        return  # Resume is optional
+
+    for row, keka_id in zip(rows, keka_ids):
+        if has_resume.get(keka_id):
+            # Store raw text representation — actual parsing can be done later
+            row["resume_text"] = f"[Resume imported from Keka — candidate {keka_id}]"
+
+
+_JOB_EMAIL_INDEX = "ux_candidates_job_email"
+
+
+@lru_cache(maxsize=1)
+def _has_job_email_index() -> bool:
+    """
+    Whether ux_candidates_job_email exists. sync_schema() can fail to
+    create it when the table already holds duplicate (job_id, email) rows.
+    """
+    indexes = inspect(engine).get_indexes(Candidate.__tablename__)
+    if any(ix["name"] == _JOB_EMAIL_INDEX for ix in indexes):
+        return True
+    print(f"[KEKA] {_JOB_EMAIL_INDEX} is missing; importing without ON CONFLICT")
+    return False
+
+
+def _insert_candidate_batch(
+    db: Session,
+    rows: List[dict],
+    keka_ids: List[str],
+    errors: List[str],
+) -> Tuple[List[dict], int]:
+    """
+    Insert one batch of candidate rows and commit it.
+
+    Rows with an email go through INSERT ... ON CONFLICT DO NOTHING on
+    ux_candidates_job_email, so duplicates are skipped by the database
+    (when the index exists).
+    Returns the summary dicts of the inserted candidates and the number
+    of rows skipped as duplicates.
+    """
+    # Without the unique index ON CONFLICT has nothing to target, so every
+    # row is inserted plainly and _run_import's known_emails pre-filter is
+    # the only duplicate check
+    use_on_conflict = _has_job_email_index()
+
+    with_email = {}
+    without_email = []
+    for keka_id, row in zip(keka_ids, rows):
+        if row["email"] and use_on_conflict:
+            with_email.setdefault(row["email"], (keka_id, row))
+        else:
+            without_email.append((keka_id, row))
+
+    inserted = []
+    try:
+        if without_email:
+            local_ids = db.execute(
+                insert(Candidate).returning(Candidate.id, sort_by_parameter_order=True),
+                [row for _, row in without_email],
+            ).scalars().all()
+            inserted.extend(
+                (local_id, keka_id, row)
+                for local_id, (keka_id, row) in zip(local_ids, without_email)
+            )
+
+        if with_email:
+            dialect_insert = (
+                sqlite.insert if db.get_bind().dialect.name == "sqlite"
+                else postgresql.insert
+            )
+            stmt = (
+                dialect_insert(Candidate)
+                .values([row for _, row in with_email.values()])
+                .on_conflict_do_nothing(
+                    index_elements=["job_id", "email"],
+                    index_where=Candidate.email.isnot(None),
+                )
+                .returning(Candidate.id, Candidate.email)
+            )
+            for local_id, email in db.execute(stmt):
+                keka_id, row = with_email[email]
+                inserted.append((local_id, keka_id, row))
+
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        errors.append(f"Failed to import batch of {len(rows)} candidates: {str(e)}")
+        return [], 0
+
+    skipped = len(rows) - len(inserted)
+    return [
+        {
+            "local_id": local_id,
+            "keka_id": keka_id,
+            "name": row["name"],
+            "email": row["email"] or "",
+            "stage": row["stage"].value,
+        }
+        for local_id, keka_id, row in inserted
+    ], skipped
+
+
+def _save_progress(
+    db: Session,
+    import_job: ImportJob,
+    skipped: int,
+    errors: List[str],
+    imported_candidates: List[dict],
+    status: Optional[ImportJobStatus] = None,
+):
+    """
+    Persist the running totals of an import job. The candidate list is
+    only read once the import has finished, so it is written just once,
+    with the final status, rather than rewritten after every batch.
+    """
+    if status is not None:
+        import_job.status = status
+    import_job.imported = len(imported_candidates)
+    import_job.skipped = skipped
+    import_job.errors = list(errors)
+    if status in (ImportJobStatus.completed, ImportJobStatus.failed):
+        import_job.candidates = list(imported_candidates)
+    db.commit()
+
+
+def _run_import(
+    import_job_id: int,
+    keka_job_id: str,
+    local_job_id: int,
+    candidate_ids: Optional[List[str]],
+):
+    """
+    Background task: stream candidates from Keka into a local job.
+    Progress is written to the import_jobs row after every batch.
+    """
+    db = SessionLocal()
+    imported_candidates = []
+    try:
+        import_job = db.query(ImportJob).filter(ImportJob.id == import_job_id).first()
+        if not import_job:
+            return
+
+        skipped = 0
+        errors = []
+        _save_progress(
+            db, import_job, skipped, errors, imported_candidates,
+            status=ImportJobStatus.running,
+        )
+
+        # Emails already imported for this job, loaded once up front so
+        # known duplicates don't cost a rate-limited resume download.
+        # The unique index, when present, catches anything this misses.
+        known_emails = {
+            email for (email,) in db.query(Candidate.email).filter(
+                Candidate.job_id == local_job_id,
+                Candidate.email.isnot(None),
+            )
+        }
+
+        # Filter to specific IDs if provided
+        id_set = set(candidate_ids) if candidate_ids else None
+
+        batch: List[dict] = []
+        batch_keka_ids: List[str] = []
+
+        try:
+            client = get_keka_client()
+            for kc in client.get_candidates(keka_job_id):
+                keka_id = str(kc.get("id", ""))
+                if id_set is not None and keka_id not in id_set:
+                    continue
+
+                email = _first(kc, _EMAIL_KEYS, "")
+                name_parts = [
+                    _first(kc, _FIRST_NAME_KEYS, ""),
+                    _first(kc, _LAST_NAME_KEYS, ""),
+                ]
+                name = " ".join(p for p in name_parts if p).strip() or "Unknown"
+                phone = _first(kc, _PHONE_KEYS, "")
+                keka_stage = _first(kc, _STAGE_KEYS, "applied")
+
+                if email and email in known_emails:
+                    skipped += 1
+                    continue
+
+                # Parse salary info if available
+                current_salary = None
+                expected_salary = None
+                try:
+                    current_salary = float(kc.get("currentSalary", 0)) or None
+                    expected_salary = float(kc.get("expectedSalary", 0)) or None
+                except (ValueError, TypeError):
+                    pass
+
+                batch.append({
+                    "job_id": local_job_id,
+                    "name": name,
+                    "email": email or None,
+                    "phone": phone or None,
+                    "current_salary": current_salary,
+                    "expected_salary": expected_salary,
+                    "resume_text": None,  # filled in by _attach_resumes
+                    "stage": _map_keka_stage(keka_stage),
+                    "applied_at": datetime.now(timezone.utc),
+                })
+                batch_keka_ids.append(keka_id)
+                if email:
+                    known_emails.add(email)  # repeats later in the stream
+
+                if len(batch) >= IMPORT_BATCH_SIZE:
+                    _attach_resumes(client, batch, batch_keka_ids)
+                    inserted, duplicates = _insert_candidate_batch(
+                        db, batch, batch_keka_ids, errors,
+                    )
+                    imported_candidates.extend(inserted)
+                    skipped += duplicates
+                    batch.clear()
+                    batch_keka_ids.clear()
+                    _save_progress(db, import_job, skipped, errors, imported_candidates)
+        except (ValueError, KekaAuthError, KekaAPIError) as e:
+            errors.append(str(e))
+            _save_progress(
+                db, import_job, skipped, errors, imported_candidates,
+                status=ImportJobStatus.failed,
+            )
+            return
+
+        if batch:
+            _attach_resumes(client, batch, batch_keka_ids)
+            inserted, duplicates = _insert_candidate_batch(
+                db, batch, batch_keka_ids, errors,
+            )
+            imported_candidates.extend(inserted)
+            skipped += duplicates
+
+        _save_progress(
+            db, import_job, skipped, errors, imported_candidates,
+            status=ImportJobStatus.completed,
+        )
+    except Exception as e:
+        print(f"[KEKA] Import job {import_job_id} crashed: {e}")
+        db.rollback()
+        db.query(ImportJob).filter(ImportJob.id == import_job_id).update(
+            {
+                "status": ImportJobStatus.failed,
+                "errors": [str(e)],
+                "candidates": imported_candidates,
+            }
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def _import_job_to_dict(import_job: ImportJob) -> dict:
+    done = import_job.status in (ImportJobStatus.completed, ImportJobStatus.failed)
+    return {
+        "job_id": import_job.id,
+        "status": import_job.status.value,
+        "imported": import_job.imported or 0,
+        "skipped": import_job.skipped or 0,
+        "errors": import_job.errors or [],
+        # The full candidate list is only sent once the import has finished
+        "candidates": (import_job.candidates or []) if done else [],
+    }
+
+
+@router.post(
+    "/import-candidates/{keka_job_id}",
+    response_model=ImportJobOut,
+    status_code=202,
+)
 def import_candidates_from_keka(
+    request: Request,
     keka_job_id: str,
     body: ImportCandidatesRequest,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role(UserRole.hr)),
 ):
     """
     Import candidates from a Keka job into a local job request.
 
-    Fetches candidates (and optionally their resumes) from Keka
-    and creates corresponding Candidate records in the local DB.
-    Skips candidates whose email already exists for the same job.
+    The import runs as a background task: this endpoint returns an
+    import job id straight away, and progress can be followed on
+    GET /keka/import-status/{job_id}.
+    Candidates whose email already exists for the same job are skipped
+    by the ux_candidates_job_email unique index.
     """
-    client = _get_client()
+    _get_client(request)
 
     # Verify local job exists
     local_job = db.query(JobRequest).filter(JobRequest.id == body.local_job_id).first()
     if not local_job:
         raise HTTPException(status_code=404, detail=f"Local job {body.local_job_id} not found")
 
-    # Fetch candidates from Keka
-    try:
-        raw_candidates = client.get_candidates(keka_job_id)
-    except KekaAuthError as e:
-        raise HTTPException(status_code=401, detail=str(e))
-    except KekaAPIError as e:
-        raise HTTPException(status_code=e.status_code or 502, detail=str(e))
+    import_job = ImportJob(
+        created_by=current_user.id,
+        local_job_id=body.local_job_id,
+        keka_job_id=keka_job_id,
+        status=ImportJobStatus.pending,
+    )
+    db.add(import_job)
+    db.commit()
+    db.refresh(import_job)
 
-    # Filter to specific IDs if provided
-    if body.candidate_ids:
-        id_set = set(body.candidate_ids)
-        raw_candidates = [c for c in raw_candidates if str(c.get("id", "")) in id_set]
+    background_tasks.add_task(
+        _run_import, import_job.id, keka_job_id, body.local_job_id, body.candidate_ids,
+    )
 
-    imported = 0
-    skipped = 0
-    errors = []
-    imported_candidates = []
+    return ImportJobOut(job_id=import_job.id, status=import_job.status.value)
 
-    for kc in raw_candidates:
-        keka_id = str(kc.get("id", ""))
-        email = kc.get("email", kc.get("emailAddress", ""))
-        name_parts = [
-            kc.get("firstName", kc.get("first_name", "")),
-            kc.get("lastName", kc.get("last_name", "")),
-        ]
-        name = " ".join(p for p in name_parts if p).strip() or "Unknown"
-        phone = kc.get("phone", kc.get("mobileNumber", ""))
-        keka_stage = kc.get("stage", kc.get("currentStage", "applied"))
-
-        # Skip if candidate with same email already exists for this job
-        if email:
-            existing = db.query(Candidate).filter(
-                Candidate.job_id == body.local_job_id,
-                Candidate.email == email,
-            ).first()
-            if existing:
-                skipped += 1
-                continue
-
-        # Try to fetch resume text
-        resume_text = ""
-        try:
-            resume_bytes = client.get_candidate_resume(keka_id)
-            if resume_bytes:
-                # Store raw text representation — actual parsing can be done later
-                resume_text = f"[Resume imported from Keka — candidate {keka_id}]"
-        except Exception:
-            pass  # Resume is optional
-
-        # Parse salary info if available
-        current_salary = None
-        expected_salary = None
-        try:
-            current_salary = float(kc.get("currentSalary", 0)) or None
-            expected_salary = float(kc.get("expectedSalary", 0)) or None
-        except (ValueError, TypeError):
-            pass
 
-        try:
-            candidate = Candidate(
-                job_id=body.local_job_id,
-                name=name,
-                email=email or None,
-                phone=phone or None,
-                current_salary=current_salary,
-                expected_salary=expected_salary,
-                resume_text=resume_text or None,
-                stage=_map_keka_stage(keka_stage),
-                applied_at=datetime.now(timezone.utc),
-            )
-            db.add(candidate)
-            db.flush()  # Get the ID
-
-            imported += 1
-            imported_candidates.append({
-                "local_id": candidate.id,
-                "keka_id": keka_id,
-                "name": name,
-                "email": email,
-                "stage": candidate.stage.value,
-            })
-        except Exception as e:
-            errors.append(f"Failed to import {name} ({email}): {str(e)}")
+def _poll_import_job(job_id: int) -> Optional[dict]:
+    with SessionLocal() as poll_db:
+        import_job = poll_db.query(ImportJob).filter(ImportJob.id == job_id).first()
+        return _import_job_to_dict(import_job) if import_job else None
+
+
+def fail_interrupted_imports():
+    """
+    On startup, mark imports left pending/running by a previous process
+    as failed. Their background task died with it, so nothing else would
+    ever finish them and their status streams would never close.
+    """
+    db = SessionLocal()
+    try:
+        count = db.query(ImportJob).filter(
+            ImportJob.status.in_([ImportJobStatus.pending, ImportJobStatus.running]),
+        ).update(
+            {"status": ImportJobStatus.failed, "errors": ["Interrupted by restart"]},
+            synchronize_session=False,
+        )
+        db.commit()
+        if count:
+            print(f"[KEKA] Marked {count} interrupted import job(s) as failed")
+    finally:
+        db.close()
 
-    db.commit()
 
-    return ImportResult(
-        imported=imported,
-        skipped=skipped,
-        errors=errors,
-        candidates=imported_candidates,
+@router.get("/import-status/{job_id}")
+def stream_import_status(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(UserRole.hr)),
+):
+    """
+    Server-Sent Events stream of an import job's progress.
+    Emits an event whenever the counters change, a heartbeat comment on
+    every other poll, and closes once the import has completed or failed.
+    """
+    if not db.query(ImportJob.id).filter(ImportJob.id == job_id).first():
+        raise HTTPException(status_code=404, detail=f"Import job {job_id} not found")
+
+    async def events():
+        last = None
+        while True:
+            # Read the row on the threadpool, but sleep on the event loop so
+            # an open stream doesn't hold a worker thread between polls
+            state = await run_in_threadpool(_poll_import_job, job_id)
+            if state is None:
+                return
+
+            if state != last:
+                yield f"data: {json.dumps(state)}\n\n"
+                last = state
+            else:
+                # Keep proxies from closing an idle stream while a slow,
+                # rate-limited batch is still running
+                yield ": ping\n\n"
+            if state["status"] in (ImportJobStatus.completed.value, ImportJobStatus.failed.value):
+                return
+            await asyncio.sleep(IMPORT_STATUS_POLL_SECONDS)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
 @router.get("/job-boards")
 def list_keka_job_boards(
+    request: Request,
     current_user: User = Depends(require_role(UserRole.hr)),
 ):
     """Fetch all available job boards from Keka."""
-    client = _get_client()
+    client = _get_client(request)
 
     try:
         boards = client.get_job_boards()
@@ -4,10 +4,10 @@ from typing import List
 
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 
 from app.db.database import get_db
-from app.db.models import Notification, User
+from app.db.models import Notification, User, JobRequest
 from app.api.auth import get_current_user
 
 router = APIRouter(prefix="/notifications", tags=["Notifications"])
@@ -41,6 +41,11 @@ def list_notifications(
     """List notifications for the current user (newest first)."""
     notifs = (
         db.query(Notification)
+        # Eager-load the related job in the same query so that touching
+        # n.job never turns into one extra SELECT per notification.
+        .options(
+            joinedload(Notification.job).load_only(JobRequest.id, JobRequest.role_title)
+        )
         .filter(Notification.user_id == user.id)
         .order_by(Notification.created_at.desc())
         .limit(50)
@@ -55,12 +60,8 @@ def unread_count(
     db: Session = Depends(get_db),
 ):
     """Return the count of unread notifications."""
-    count = (
-        db.query(Notification)
-        .filter(Notification.user_id == user.id, Notification.is_read == False)
-        .count()
-    )
-    return {"count": count}
+    # Maintained on the user row, which get_current_user has already loaded
+    return {"count": user.unread_count}
 
 
 @router.post("/{notif_id}/read")
@@ -77,7 +78,11 @@ def mark_read(
     )
     if not notif:
         raise HTTPException(status_code=404, detail="Notification not found")
-    notif.is_read = True
+    if not notif.is_read:
+        notif.is_read = True
+        db.query(User).filter(User.id == user.id, User.unread_count > 0).update(
+            {"unread_count": User.unread_count - 1}
+        )
     db.commit()
     return {"ok": True}
 
@@ -88,9 +93,15 @@ def mark_all_read(
     db: Session = Depends(get_db),
 ):
     """Mark all notifications as read for the current user."""
-    db.query(Notification).filter(
+    updated = db.query(Notification).filter(
         Notification.user_id == user.id,
         Notification.is_read == False,
     ).update({"is_read": True})
+    # Subtract what was actually marked rather than zeroing, so a
+    # notification inserted meanwhile stays counted
+    if updated:
+        db.query(User).filter(User.id == user.id).update(
+            {"unread_count": User.unread_count - updated}
+        )
     db.commit()
     return {"ok": True}
@@ -1,6 +1,6 @@
 # app/db/database.py
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker, declarative_base
 import os
 
@@ -47,3 +47,60 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# One-off data fills run right after a missing column has been added
+_COLUMN_BACKFILLS = {
+    "users.unread_count": (
+        "UPDATE users SET unread_count = ("
+        "SELECT COUNT(*) FROM notifications "
+        "WHERE notifications.user_id = users.id AND notifications.is_read = false)"
+    ),
+}
+
+
+def sync_schema():
+    """
+    Create missing tables, then add any columns and indexes declared
+    on tables that already existed (create_all() leaves existing
+    tables untouched).
+    """
+    Base.metadata.create_all(bind=engine)
+
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = (
+                f"ALTER TABLE {table.name} ADD COLUMN {column.name} "
+                f"{column.type.compile(dialect=engine.dialect)}"
+            )
+            if column.server_default is not None:
+                ddl += f" DEFAULT {column.server_default.arg}"
+            if not column.nullable:
+                ddl += " NOT NULL"
+
+            # One transaction per column, so a column that can't be added
+            # this way (e.g. NOT NULL without a server default, or an enum
+            # type that doesn't exist yet) doesn't block startup
+            try:
+                with engine.begin() as conn:
+                    conn.execute(text(ddl))
+                    backfill = _COLUMN_BACKFILLS.get(f"{table.name}.{column.name}")
+                    if backfill:
+                        conn.execute(text(backfill))
+            except Exception as e:
+                print(f"[DB] WARNING: could not add column {table.name}.{column.name}: {e}")
+                continue
+            print(f"[DB] Added column {table.name}.{column.name}")
+
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                index.create(bind=engine, checkfirst=True)
+            except Exception as e:
+                # e.g. existing duplicate rows violate a new unique index;
+                # callers that rely on an index check for it themselves
+                print(f"[DB] WARNING: could not create index {index.name}: {e}")
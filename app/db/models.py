@@ -3,12 +3,12 @@
 Recruitment AI — Database Schema
 Tables covering the active hiring pipeline:
   users, job_requests, candidates, candidate_evaluations,
-  notifications, jd_form_data, jd_memories
+  notifications, jd_form_data, jd_memories, import_jobs
 """
 
 from sqlalchemy import (
     Column, Integer, String, Text, Float, DateTime, Boolean,
-    ForeignKey, Enum as SAEnum, JSON,
+    ForeignKey, Enum as SAEnum, JSON, Index, text, event, update,
 )
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
@@ -59,6 +59,13 @@ class CandidateStage(str, enum.Enum):
     rejected = "rejected"
 
 
+class ImportJobStatus(str, enum.Enum):
+    pending = "pending"
+    running = "running"
+    completed = "completed"
+    failed = "failed"
+
+
 def _utc_now():
     return datetime.now(timezone.utc)
 
@@ -75,6 +82,8 @@ class User(Base):
     role = Column(SAEnum(UserRole), nullable=False)
     department = Column(String(120), nullable=True)
     phone = Column(String(20), nullable=True)
+    # Denormalized count of unread notifications, polled by the frontend
+    unread_count = Column(Integer, default=0, server_default="0", nullable=False)
     created_at = Column(DateTime, default=_utc_now)
 
     # relationships
@@ -140,6 +149,16 @@ class Candidate(Base):
     stage = Column(SAEnum(CandidateStage), default=CandidateStage.applied)
     applied_at = Column(DateTime, default=_utc_now)
 
+    __table_args__ = (
+        # One candidate per email per job; lets imports skip duplicates
+        # with INSERT ... ON CONFLICT DO NOTHING
+        Index(
+            "ux_candidates_job_email", "job_id", "email", unique=True,
+            postgresql_where=text("email IS NOT NULL"),
+            sqlite_where=text("email IS NOT NULL"),
+        ),
+    )
+
     # relationships
     job = relationship("JobRequest", back_populates="candidates")
     evaluation = relationship(
@@ -198,6 +217,17 @@ class Notification(Base):
     job = relationship("JobRequest")
 
 
+@event.listens_for(Notification, "after_insert")
+def _increment_unread_count(mapper, connection, target):
+    """Keep users.unread_count in step with every new unread notification."""
+    if not target.is_read:
+        connection.execute(
+            update(User.__table__)
+            .where(User.__table__.c.id == target.user_id)
+            .values(unread_count=User.__table__.c.unread_count + 1)
+        )
+
+
 # ── 6. JD Form Data ──────────────────────────────────
 
 class JDFormData(Base):
@@ -242,3 +272,28 @@ class JDMemory(Base):
 
     # relationships
     user = relationship("User")
+
+
+# ── 8. Import Jobs ───────────────────────────────────
+
+class ImportJob(Base):
+    __tablename__ = "import_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
+    local_job_id = Column(Integer, ForeignKey("job_requests.id"), nullable=False)
+    keka_job_id = Column(String(100), nullable=False)
+
+    status = Column(
+        SAEnum(ImportJobStatus), default=ImportJobStatus.pending, nullable=False,
+    )
+    imported = Column(Integer, default=0)
+    skipped = Column(Integer, default=0)
+    errors = Column(JSON, nullable=True)
+    candidates = Column(JSON, nullable=True)
+
+    created_at = Column(DateTime, default=_utc_now)
+    updated_at = Column(DateTime, default=_utc_now, onupdate=_utc_now)
+
+    # relationships
+    job = relationship("JobRequest")
@@ -4,8 +4,9 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
-from app.db.database import engine, Base
+from app.db.database import sync_schema
 from app.db import models  # noqa: F401 – registers models with Base
 
 from app.api.auth import router as auth_router
@@ -14,23 +15,40 @@ from app.api.cv_analysis import router as cv_router
 from app.api.job_requests import router as jobs_router
 from app.api.notifications import router as notif_router
 from app.api.analytics import router as analytics_router
-from app.api.keka import router as keka_router
+from app.api.keka import router as keka_router, fail_interrupted_imports
+from app.utils.keka_client import get_keka_client
 from app.utils.scheduler import start_scheduler, shutdown_scheduler, reschedule_active_jobs
+from app.utils.text_cleanup import shutdown_extraction_pool
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Create all tables on startup
-    Base.metadata.create_all(bind=engine)
+    # Create missing tables and indexes on startup
+    sync_schema()
+    # Imports running when the last process stopped can never finish now
+    fail_interrupted_imports()
     # Start background scheduler
     start_scheduler()
     reschedule_active_jobs()
+    # Build the Keka client once so every request shares its connection pool
+    try:
+        app.state.keka_client = get_keka_client()
+    except ValueError as e:
+        app.state.keka_client = None
+        print(f"[KEKA] Integration not configured: {e}")
     yield
     # Shutdown scheduler
     shutdown_scheduler()
+    if app.state.keka_client is not None:
+        app.state.keka_client.close()
+    shutdown_extraction_pool()
 
 
-app = FastAPI(title="Recruitment AI Backend", lifespan=lifespan)
+app = FastAPI(
+    title="Recruitment AI Backend",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 # ── CORS — allow Vercel frontend + local dev ──
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:5173")
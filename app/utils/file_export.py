@@ -3,79 +3,132 @@ from docx import Document
 from docx.shared import Pt
 from reportlab.lib.pagesizes import A4
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.styles import ParagraphStyle
 from reportlab.lib.enums import TA_LEFT
 import os
+import re
 from datetime import datetime
+from functools import lru_cache
+from typing import BinaryIO, Optional, Tuple, Union
+
+
+# A line made up solely of a **bold** run, e.g. "**Responsibilities**"
+_BOLD_LINE_RE = re.compile(r"^[^\S\n]*(?=\*\*).*\*\*[^\S\n]*$", re.M)
+
+# The first non-blank line of the text, when it is a bold-only line
+_BOLD_TITLE_RE = re.compile(r"\A((?:[^\S\n]*\n)*)[^\S\n]*(\*\*.*\*\*)[^\S\n]*$", re.M)
+
+
+def _bold_title_to_heading(match: re.Match) -> str:
+    return match.group(1) + "# " + match.group(2).replace("**", "")
+
+
+def _bold_line_to_heading(match: re.Match) -> str:
+    return "## " + match.group(0).strip().replace("**", "")
 
 
 # -------------------------------------------------
 # Normalize Markdown (**Title**, **Section**) → #, ##
 # -------------------------------------------------
+@lru_cache(maxsize=64)
 def normalize_markdown(text: str) -> str:
-    lines = text.split("\n")
-    normalized = []
+    # Cached: DOCX and PDF exports of the same JD normalize it only once.
+    # Only a bold first non-blank line becomes the main title; leading
+    # blank lines are preserved.
+    text = _BOLD_TITLE_RE.sub(_bold_title_to_heading, text, count=1)
+    return _BOLD_LINE_RE.sub(_bold_line_to_heading, text)
 
-    for i, line in enumerate(lines):
-        stripped = line.strip()
 
-        # MAIN TITLE
-        if i == 0 and stripped.startswith("**") and stripped.endswith("**"):
-            normalized.append("# " + stripped.replace("**", ""))
-            continue
-
-        # ALL SECTION HEADERS
-        if stripped.startswith("**") and stripped.endswith("**"):
-            normalized.append("## " + stripped.replace("**", ""))
+# -------------------------------------------------
+# Block parsing (shared by DOCX + PDF)
+# -------------------------------------------------
+_HEADING_KINDS = {"#": "title", "##": "section"}
+# "-" and "*" only mark a bullet when followed by a space, so bold
+# labels such as "**Location:** Remote" stay intact
+_BULLET_PREFIXES = ("•", "- ", "* ")
+
+
+@lru_cache(maxsize=64)
+def _parse_blocks(jd_text: str) -> Tuple[Tuple[str, str], ...]:
+    """
+    Classify each line of a JD into (kind, text) blocks, where kind is
+    one of title / section / bullet / body / blank. Cached so a DOCX and
+    a PDF export of the same JD share one parse.
+    """
+    blocks = []
+
+    for line in normalize_markdown(jd_text).split("\n"):
+        line = line.strip()
+        if not line:
+            blocks.append(("blank", ""))
             continue
 
-        normalized.append(line)
+        head, sep, rest = line.partition(" ")
+        kind = _HEADING_KINDS.get(head) if sep else None
+        if kind:
+            blocks.append((kind, rest.lstrip()))
+        elif line.startswith(_BULLET_PREFIXES):
+            # The marker is always the first character; drop it by slicing
+            blocks.append(("bullet", line[1:].lstrip()))
+        else:
+            blocks.append(("body", line))
 
-    return "\n".join(normalized)
+    return tuple(blocks)
 
 
 # -------------------------------------------------
 # DOCX GENERATOR (PRO STYLE – IMAGE 1)
 # -------------------------------------------------
-def generate_docx(jd_text: str) -> BytesIO:
-    jd_text = normalize_markdown(jd_text)
+def _docx_title(doc: Document, text: str):
+    h = doc.add_heading(text, level=0)
+    run = h.runs[0]
+    run.font.size = Pt(26)  # Increased from 22
+    run.bold = True
+    h.paragraph_format.space_after = Pt(16)
 
-    buffer = BytesIO()
+
+def _docx_section(doc: Document, text: str):
+    h = doc.add_heading(text, level=1)
+    run = h.runs[0]
+    run.font.size = Pt(16)  # Increased from 14
+    run.bold = True
+    h.paragraph_format.space_before = Pt(12)
+    h.paragraph_format.space_after = Pt(8)
+
+
+def _docx_bullet(doc: Document, text: str):
+    p = doc.add_paragraph(text, style="List Bullet")
+    p.paragraph_format.space_after = Pt(4)
+
+
+def _docx_body(doc: Document, text: str):
+    p = doc.add_paragraph(text)
+    p.paragraph_format.space_after = Pt(6)
+
+
+_DOCX_HANDLERS = {
+    "title": _docx_title,
+    "section": _docx_section,
+    "bullet": _docx_bullet,
+    "body": _docx_body,
+}
+
+
+def _build_docx(jd_text: str, target: Union[str, BinaryIO]):
+    """Render the JD as DOCX into `target` (a file path or writable file)."""
     doc = Document()
 
-    for line in jd_text.split("\n"):
-        line = line.strip()
-        if not line:
-            continue
+    for kind, text in _parse_blocks(jd_text):
+        handler = _DOCX_HANDLERS.get(kind)
+        if handler:  # blank lines are skipped
+            handler(doc, text)
 
-        # MAIN TITLE
-        if line.startswith("# "):
-            h = doc.add_heading(line.replace("# ", ""), level=0)
-            run = h.runs[0]
-            run.font.size = Pt(26)  # Increased from 22
-            run.bold = True
-            h.paragraph_format.space_after = Pt(16)
-
-        # SECTION HEADERS
-        elif line.startswith("## "):
-            h = doc.add_heading(line.replace("## ", ""), level=1)
-            run = h.runs[0]
-            run.font.size = Pt(16)  # Increased from 14
-            run.bold = True
-            h.paragraph_format.space_before = Pt(12)
-            h.paragraph_format.space_after = Pt(8)
-
-        # BULLETS
-        elif line.startswith(("•", "-", "*")):
-            p = doc.add_paragraph(line.replace("•", "").strip(), style="List Bullet")
-            p.paragraph_format.space_after = Pt(4)
-
-        # NORMAL TEXT
-        else:
-            p = doc.add_paragraph(line)
-            p.paragraph_format.space_after = Pt(6)
+    doc.save(target)
 
-    doc.save(buffer)
+
+def generate_docx(jd_text: str) -> BytesIO:
+    buffer = BytesIO()
+    _build_docx(jd_text, buffer)
     buffer.seek(0)
     return buffer
 
@@ -83,105 +136,98 @@ def generate_docx(jd_text: str) -> BytesIO:
 # -------------------------------------------------
 # PDF GENERATOR
 # -------------------------------------------------
-def generate_pdf(jd_text: str) -> BytesIO:
-    jd_text = normalize_markdown(jd_text)
-    buffer = BytesIO()
-
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=A4,
-        rightMargin=40,
-        leftMargin=40,
-        topMargin=40,
-        bottomMargin=40
-    )
-
-    styles = getSampleStyleSheet()
-
-    title = ParagraphStyle(
+_PDF_STYLES = {
+    "title": ParagraphStyle(
         "Title",
         fontName="Helvetica-Bold",
         fontSize=26,  # Increased from 20
         spaceAfter=16,  # Increased from 14
         textColor="navy"  # Optional: match Image 2 color
-    )
-
-    section = ParagraphStyle(
+    ),
+    "section": ParagraphStyle(
         "Section",
         fontName="Helvetica-Bold",
         fontSize=16,  # Increased from 14
         spaceBefore=12,  # Increased from 10
         spaceAfter=8  # Increased from 6
-    )
-
-    body = ParagraphStyle(
+    ),
+    "body": ParagraphStyle(
         "Body",
         fontSize=11,
         leading=14,
         spaceAfter=6,
         alignment=TA_LEFT
-    )
-
-    bullet = ParagraphStyle(
+    ),
+    "bullet": ParagraphStyle(
         "Bullet",
         fontSize=11,
         leftIndent=14,
         spaceAfter=4
+    ),
+}
+
+
+def _build_pdf(jd_text: str, target: Union[str, BinaryIO]):
+    """Render the JD as PDF into `target` (a file path or writable file)."""
+    doc = SimpleDocTemplate(
+        target,
+        pagesize=A4,
+        rightMargin=40,
+        leftMargin=40,
+        topMargin=40,
+        bottomMargin=40
     )
 
     elements = []
 
-    for line in jd_text.split("\n"):
-        line = line.strip()
-        if not line:
+    for kind, text in _parse_blocks(jd_text):
+        if kind == "blank":
             elements.append(Spacer(1, 6))
-            continue
-
-        if line.startswith("# "):
-            elements.append(Paragraph(line.replace("# ", ""), title))
-        elif line.startswith("## "):
-            elements.append(Paragraph(line.replace("## ", ""), section))
-        elif line.startswith(("•", "-", "*")):
-            elements.append(Paragraph(line.replace("•", ""), bullet))
         else:
-            elements.append(Paragraph(line, body))
+            elements.append(Paragraph(text, _PDF_STYLES[kind]))
 
     doc.build(elements)
+
+
+def generate_pdf(jd_text: str) -> BytesIO:
+    buffer = BytesIO()
+    _build_pdf(jd_text, buffer)
     buffer.seek(0)
     return buffer
 
 # -------------------------------------------------
 # EXPORT FUNCTIONS
 # -------------------------------------------------
-def export_to_docx(jd_text: str, filename: str) -> str:
-    buffer = generate_docx(jd_text)
-
+def _export_path(filename: str, ext: str, timestamp: Optional[str]) -> str:
     output_dir = "exports"
     os.makedirs(output_dir, exist_ok=True)
 
-    path = os.path.join(
-        output_dir,
-        f"{filename}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
-    )
+    timestamp = timestamp or datetime.now().strftime('%Y%m%d_%H%M%S')
+    return os.path.join(output_dir, f"{filename}_{timestamp}.{ext}")
 
-    with open(path, "wb") as f:
-        f.write(buffer.getvalue())
 
-    return path
+def export_to_docx(jd_text: str, filename: str, timestamp: Optional[str] = None) -> str:
+    path = _export_path(filename, "docx", timestamp)
 
+    # Write straight to disk — no intermediate in-memory copy
+    _build_docx(jd_text, path)
 
-def export_to_pdf(jd_text: str, filename: str) -> str:
-    buffer = generate_pdf(jd_text)
+    return path
 
-    output_dir = "exports"
-    os.makedirs(output_dir, exist_ok=True)
 
-    path = os.path.join(
-        output_dir,
-        f"{filename}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-    )
+def export_to_pdf(jd_text: str, filename: str, timestamp: Optional[str] = None) -> str:
+    path = _export_path(filename, "pdf", timestamp)
 
-    with open(path, "wb") as f:
-        f.write(buffer.getvalue())
+    # Write straight to disk — no intermediate in-memory copy
+    _build_pdf(jd_text, path)
 
     return path
+
+
+def export_both(jd_text: str, filename: str) -> Tuple[str, str]:
+    """Export DOCX + PDF with one shared timestamp so the filenames pair up."""
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    return (
+        export_to_docx(jd_text, filename, timestamp),
+        export_to_pdf(jd_text, filename, timestamp),
+    )
@@ -5,8 +5,31 @@
 
 import os
 import time
+import threading
+from collections import deque
+from io import BytesIO
 import requests
-from typing import Optional, Dict, List, Any
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Optional, Dict, List, Any, Iterator, BinaryIO
+
+# orjson is an optional accelerator for decoding large paginated payloads
+try:
+    import orjson
+
+    def _json(response: requests.Response) -> Any:
+        return orjson.loads(response.content)
+except ImportError:
+    def _json(response: requests.Response) -> Any:
+        return response.json()
+
+
+class _DiscardSink:
+    """Write-only file object that throws away everything written to it."""
+
+    def write(self, data: bytes) -> int:
+        return len(data)
 
 
 class KekaAuthError(Exception):
@@ -34,6 +57,12 @@ class KekaClient:
 
     TOKEN_URL = "https://login.keka.com/connect/token"
     DEFAULT_PAGE_SIZE = 100
+    # (connect, read) — fail fast on unreachable hosts, allow slow downloads
+    TIMEOUT = (3, 30)
+    # Concurrent downloads for bulk resume fetches (still rate limited)
+    RESUME_FETCH_WORKERS = 8
+    RATE_LIMIT_PER_MINUTE = 50
+    RESUME_CHUNK_SIZE = 64 * 1024
 
     def __init__(
         self,
@@ -50,9 +79,27 @@ class KekaClient:
         # Token cache
         self._access_token: Optional[str] = None
         self._token_expiry: float = 0  # epoch seconds
-
-        # Rate limiting
-        self._request_timestamps: list = []
+        self._token_lock = threading.Lock()
+
+        # Rate limiting (shared by all threads using this client)
+        self._request_timestamps: deque = deque(maxlen=self.RATE_LIMIT_PER_MINUTE)
+        self._rate_lock = threading.Lock()
+
+        # One session for the lifetime of the client, so TCP/TLS
+        # connections to Keka are kept alive and reused across calls.
+        # Idempotent GETs are retried on transient gateway errors.
+        self._session = requests.Session()
+        self._session.mount("https://", HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=20,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.3,
+                status_forcelist=[502, 503, 504],
+                allowed_methods=["GET"],
+                raise_on_status=False,
+            ),
+        ))
 
         if not self.base_url:
             raise ValueError(
@@ -60,6 +107,16 @@ class KekaClient:
                 "Example: https://yourcompany.keka.com"
             )
 
+    def close(self):
+        """Close the underlying HTTP session and its pooled connections."""
+        self._session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
     # ─────────────────────────────────────────────────────
     # Authentication
     # ─────────────────────────────────────────────────────
@@ -81,14 +138,14 @@ class KekaClient:
         }
 
         try:
-            response = requests.post(
+            response = self._session.post(
                 self.TOKEN_URL,
                 data=payload,
                 headers={"Content-Type": "application/x-www-form-urlencoded"},
-                timeout=30,
+                timeout=self.TIMEOUT,
             )
             response.raise_for_status()
-            data = response.json()
+            data = _json(response)
 
             self._access_token = data["access_token"]
             # Cache token with a 5-minute safety margin
@@ -102,31 +159,39 @@ class KekaClient:
             raise KekaAuthError(f"Failed to generate Keka access token: {e}")
 
     def _get_token(self) -> str:
-        """Get a valid access token, refreshing if expired."""
-        if not self._access_token or time.time() >= self._token_expiry:
-            return self._generate_token()
-        return self._access_token
+        """
+        Get a valid access token, refreshing if expired.
+        Concurrent callers share a single refresh (double-checked lock).
+        """
+        token = self._access_token
+        if token and time.time() < self._token_expiry:
+            return token
+
+        with self._token_lock:
+            if not self._access_token or time.time() >= self._token_expiry:
+                return self._generate_token()
+            return self._access_token
 
     # ─────────────────────────────────────────────────────
     # Rate Limiting
     # ─────────────────────────────────────────────────────
 
     def _wait_for_rate_limit(self):
-        """Enforce 50 requests/minute rate limit."""
-        now = time.time()
-        # Remove timestamps older than 60 seconds
-        self._request_timestamps = [
-            ts for ts in self._request_timestamps if now - ts < 60
-        ]
-
-        if len(self._request_timestamps) >= 50:
-            # Wait until the oldest request in the window expires
-            wait_time = 60 - (now - self._request_timestamps[0]) + 0.5
-            if wait_time > 0:
-                print(f"[KEKA] Rate limit reached. Waiting {wait_time:.1f}s...")
-                time.sleep(wait_time)
-
-        self._request_timestamps.append(time.time())
+        """Enforce 50 requests/minute rate limit across all threads."""
+        with self._rate_lock:
+            now = time.time()
+            # Drop timestamps older than 60 seconds (oldest are on the left)
+            while self._request_timestamps and now - self._request_timestamps[0] >= 60:
+                self._request_timestamps.popleft()
+
+            if len(self._request_timestamps) >= self.RATE_LIMIT_PER_MINUTE:
+                # Wait until the oldest request in the window expires
+                wait_time = 60 - (now - self._request_timestamps[0]) + 0.5
+                if wait_time > 0:
+                    print(f"[KEKA] Rate limit reached. Waiting {wait_time:.1f}s...")
+                    time.sleep(wait_time)
+
+            self._request_timestamps.append(time.time())
 
     # ─────────────────────────────────────────────────────
     # HTTP Request Wrapper
@@ -140,10 +205,13 @@ class KekaClient:
         json_data: Optional[Dict] = None,
         files: Optional[Dict] = None,
         retry_on_401: bool = True,
+        stream: bool = False,
     ) -> requests.Response:
         """
         Make an authenticated request to the Keka API.
         Auto-retries once on 401 (token expired).
+        With stream=True the body is not read up front; the caller
+        must consume and close the response.
         """
         self._wait_for_rate_limit()
 
@@ -154,26 +222,30 @@ class KekaClient:
         }
 
         try:
-            response = requests.request(
+            response = self._session.request(
                 method=method,
                 url=url,
                 headers=headers,
                 params=params,
                 json=json_data,
                 files=files,
-                timeout=30,
+                timeout=self.TIMEOUT,
+                stream=stream,
             )
 
             # Auto-retry on 401 (token expired)
             if response.status_code == 401 and retry_on_401:
                 print("[KEKA] Token expired, refreshing...")
+                response.close()
                 self._access_token = None
                 return self._request(
-                    method, path, params, json_data, files, retry_on_401=False
+                    method, path, params, json_data, files,
+                    retry_on_401=False, stream=stream,
                 )
 
             if response.status_code >= 400:
                 error_msg = response.text[:500]
+                response.close()
                 raise KekaAPIError(response.status_code, error_msg)
 
             return response
@@ -185,37 +257,44 @@ class KekaClient:
     # Pagination Helper
     # ─────────────────────────────────────────────────────
 
-    def _get_all_pages(self, path: str, params: Optional[Dict] = None) -> List[Dict]:
-        """Fetch all pages of a paginated endpoint."""
+    def _iter_pages(self, path: str, params: Optional[Dict] = None) -> Iterator[Dict]:
+        """
+        Yield records from a paginated endpoint one page at a time.
+        The next page is only requested once the caller has consumed
+        the current one.
+        """
         params = params or {}
         params.setdefault("pageSize", self.DEFAULT_PAGE_SIZE)
         params.setdefault("pageNumber", 1)
 
-        all_results = []
+        fetched = 0
 
         while True:
             response = self._request("GET", path, params=params)
-            data = response.json()
+            data = _json(response)
 
             # Keka wraps results in a "data" key
             records = data.get("data", data) if isinstance(data, dict) else data
-            if isinstance(records, list):
-                all_results.extend(records)
-            else:
+            if not isinstance(records, list):
                 # Single object response
-                return [records] if records else []
+                if records:
+                    yield records
+                return
+
+            yield from records
+            fetched += len(records)
 
             # Check if there are more pages
-            if isinstance(data, dict):
-                total = data.get("totalCount", len(all_results))
-                if len(all_results) >= total:
-                    break
-            else:
-                break
+            if not records or not isinstance(data, dict):
+                return
+            if fetched >= data.get("totalCount", fetched):
+                return
 
             params["pageNumber"] += 1
 
-        return all_results
+    def _get_all_pages(self, path: str, params: Optional[Dict] = None) -> List[Dict]:
+        """Fetch all pages of a paginated endpoint."""
+        return list(self._iter_pages(path, params))
 
     # ─────────────────────────────────────────────────────
     # Job Boards
@@ -224,7 +303,7 @@ class KekaClient:
     def get_job_boards(self) -> List[Dict]:
         """GET /v1/hire/jobboards — Fetch all job boards."""
         response = self._request("GET", "jobboards")
-        data = response.json()
+        data = _json(response)
         return data.get("data", data) if isinstance(data, dict) else data
 
     # ─────────────────────────────────────────────────────
@@ -252,7 +331,7 @@ class KekaClient:
         Get the application form fields for a specific job.
         """
         response = self._request("GET", f"jobs/{job_id}/applicationfields")
-        data = response.json()
+        data = _json(response)
         return data.get("data", data) if isinstance(data, dict) else data
 
     # ─────────────────────────────────────────────────────
@@ -263,22 +342,48 @@ class KekaClient:
         self,
         job_id: str,
         archived: bool = False,
-    ) -> List[Dict]:
+    ) -> Iterator[Dict]:
         """
         GET /v1/hire/jobs/{jobId}/candidates
-        Fetch all candidates for a job.
+        Stream all candidates for a job, page by page.
 
         Args:
             job_id: Keka job ID
             archived: If True, fetch archived candidates
 
-        Returns:
-            List of candidate dicts
+        Yields:
+            Candidate dicts
         """
         params = {}
         if archived:
             params["isArchived"] = True
-        return self._get_all_pages(f"jobs/{job_id}/candidates", params)
+        yield from self._iter_pages(f"jobs/{job_id}/candidates", params)
+
+    def download_candidate_resume(self, candidate_id: str, dest: BinaryIO) -> bool:
+        """
+        GET /v1/hire/jobs/candidate/{candidateId}/resume
+        Stream a candidate's resume file into `dest` chunk by chunk,
+        so memory use stays flat regardless of file size.
+
+        Returns:
+            True if a resume was written, False if there is none.
+        """
+        try:
+            response = self._request(
+                "GET", f"jobs/candidate/{candidate_id}/resume", stream=True
+            )
+        except KekaAPIError:
+            return False
+
+        written = 0
+        with response:
+            try:
+                for chunk in response.iter_content(chunk_size=self.RESUME_CHUNK_SIZE):
+                    dest.write(chunk)
+                    written += len(chunk)
+            except requests.exceptions.RequestException:
+                return False
+        return written > 0
 
     def get_candidate_resume(self, candidate_id: str) -> Optional[bytes]:
         """
@@ -288,13 +393,31 @@ class KekaClient:
         Returns:
             Raw file bytes, or None if no resume.
         """
-        try:
-            response = self._request("GET", f"jobs/candidate/{candidate_id}/resume")
-            if response.status_code == 200 and response.content:
-                return response.content
-            return None
-        except KekaAPIError:
-            return None
+        buffer = BytesIO()
+        if self.download_candidate_resume(candidate_id, buffer):
+            return buffer.getvalue()
+        return None
+
+    def has_candidate_resume(self, candidate_id: str) -> bool:
+        """
+        Stream a candidate's resume and discard the bytes, for callers
+        that only need to know whether one exists.
+        """
+        return self.download_candidate_resume(candidate_id, _DiscardSink())
+
+    def bulk_has_resumes(self, candidate_ids: List[str]) -> Dict[str, bool]:
+        """
+        Check many candidates for a resume concurrently. Each download is
+        streamed and discarded, so memory stays flat for any batch size.
+
+        Returns:
+            Mapping of candidate ID to whether a resume was found.
+        """
+        if not candidate_ids:
+            return {}
+        workers = min(self.RESUME_FETCH_WORKERS, len(candidate_ids))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return dict(zip(candidate_ids, pool.map(self.has_candidate_resume, candidate_ids)))
 
     def get_candidate_interviews(
         self, job_id: str, candidate_id: str
@@ -306,7 +429,7 @@ class KekaClient:
         response = self._request(
             "GET", f"jobs/{job_id}/candidate/{candidate_id}/interviews"
         )
-        data = response.json()
+        data = _json(response)
         return data.get("data", data) if isinstance(data, dict) else data
 
     def get_candidate_scorecards(
@@ -319,7 +442,7 @@ class KekaClient:
         response = self._request(
             "GET", f"jobs/{job_id}/candidate/{candidate_id}/scorecards"
         )
-        data = response.json()
+        data = _json(response)
         return data.get("data", data) if isinstance(data, dict) else data
 
     # ─────────────────────────────────────────────────────
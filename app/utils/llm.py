@@ -1,6 +1,7 @@
 import os
 import logging
 import threading
+from functools import lru_cache
 from dotenv import load_dotenv
 from langchain_groq import ChatGroq
 
@@ -57,12 +58,35 @@ class GroqKeyManager:
 _manager = GroqKeyManager()
 
 
-def get_llm():
-    """Return a ChatGroq instance using the currently active API key."""
+@lru_cache(maxsize=None)
+def _llm_for_key(api_key: str) -> ChatGroq:
+    """One ChatGroq client (and HTTP connection pool) per API key."""
     return ChatGroq(
         model="llama-3.3-70b-versatile",
         temperature=0.3,
-        api_key=_manager.current_key,
+        api_key=api_key,
+    )
+
+
+def get_llm():
+    """Return a ChatGroq instance using the currently active API key."""
+    return _llm_for_key(_manager.current_key)
+
+
+def reset_llm():
+    """Drop cached ChatGroq clients (e.g. after changing keys or in tests)."""
+    _llm_for_key.cache_clear()
+
+
+def _is_rate_limit(error: Exception) -> bool:
+    error_str = str(error).lower()
+    return (
+        "rate_limit" in error_str
+        or "rate limit" in error_str
+        or "429" in error_str
+        or "token" in error_str and "limit" in error_str
+        or "resource_exhausted" in error_str
+        or "quota" in error_str
     )
 
 
@@ -90,17 +114,7 @@ def call_llm(prompt):
             response = llm.invoke(prompt)
             return response
         except Exception as e:
-            error_str = str(e).lower()
-            is_rate_limit = (
-                "rate_limit" in error_str
-                or "rate limit" in error_str
-                or "429" in error_str
-                or "token" in error_str and "limit" in error_str
-                or "resource_exhausted" in error_str
-                or "quota" in error_str
-            )
-
-            if is_rate_limit:
+            if _is_rate_limit(e):
                 tried += 1
                 last_error = e
                 logger.warning(
@@ -118,3 +132,55 @@ def call_llm(prompt):
         f"Please wait or add more keys to GROQ_API_KEYS in your .env file. "
         f"Last error: {last_error}"
     )
+
+
+def call_llm_batch(prompts: list, max_concurrency: int = 8) -> list:
+    """
+    Invoke the LLM on many prompts concurrently via ChatGroq.batch().
+
+    Prompts that hit a rate limit are retried on the next API key.
+    Any other per-prompt failure is returned as the exception object
+    in that prompt's slot, so one bad item never fails the whole batch.
+
+    Returns:
+        One response (or exception) per prompt, in order.
+
+    Raises:
+        RuntimeError: If prompts are still rate-limited after all keys.
+    """
+    results = [None] * len(prompts)
+    pending = list(range(len(prompts)))
+    tried = 0
+
+    while pending and tried < _manager.total_keys:
+        llm = get_llm()
+        key_num = _manager._current + 1
+        logger.info(f"[LLM] Batch of {len(pending)} calls with API key #{key_num}")
+        outputs = llm.batch(
+            [prompts[i] for i in pending],
+            config={"max_concurrency": max_concurrency},
+            return_exceptions=True,
+        )
+
+        rate_limited = []
+        for i, output in zip(pending, outputs):
+            results[i] = output
+            if isinstance(output, Exception) and _is_rate_limit(output):
+                rate_limited.append(i)
+
+        pending = rate_limited
+        if pending:
+            tried += 1
+            logger.warning(
+                f"[LLM] {len(pending)} batch call(s) rate-limited on key #{key_num}"
+            )
+            if tried < _manager.total_keys:
+                _manager.rotate()
+
+    if pending:
+        raise RuntimeError(
+            f"All {_manager.total_keys} Groq API key(s) have been rate-limited. "
+            f"Please wait or add more keys to GROQ_API_KEYS in your .env file. "
+            f"Last error: {results[pending[-1]]}"
+        )
+    return results
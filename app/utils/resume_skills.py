@@ -1,6 +1,14 @@
-import json
-from typing import Dict, List
-from app.utils.llm import call_llm
+import re
+from functools import lru_cache
+from typing import Dict, List, Tuple
+from langchain_core.prompts import PromptTemplate
+from app.utils.llm import call_llm, call_llm_batch
+
+# orjson is an optional accelerator; fall back to the stdlib parser
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
 
 
 SKILL_EXTRACTION_PROMPT = """
@@ -29,62 +37,120 @@ Resume Text:
 """
 
 
-def extract_skills_llm(
-    resume_text: str,
-    role_context: str | None = None
-) -> Dict[str, List[str]]:
-    """
-    Extracts structured skills using LLM.
-    Optionally conditions extraction on job role.
-    """
+# Parsed once at import; the role variant has the prefix already inlined
+_SKILL_PROMPT = PromptTemplate.from_template(SKILL_EXTRACTION_PROMPT)
+_ROLE_SKILL_PROMPT = PromptTemplate.from_template(
+    "Target Job Role: {role_context}\n\n" + SKILL_EXTRACTION_PROMPT
+)
+
 
+def _empty_skills() -> Dict[str, List[str]]:
+    return {
+        "core_skills": [],
+        "tools": [],
+        "domain_skills": []
+    }
 
 
-    prompt = SKILL_EXTRACTION_PROMPT
+def _build_skill_prompt(resume_text: str, role_context: str | None) -> str:
     if role_context:
-        prompt = (
-            f"Target Job Role: {role_context}\n\n" + prompt
+        return _ROLE_SKILL_PROMPT.format(
+            role_context=role_context, resume_text=resume_text
         )
+    return _SKILL_PROMPT.format(resume_text=resume_text)
 
-    response = call_llm(
-    prompt.format(resume_text=resume_text)
-    )
 
+def _parse_skills(response) -> Dict[str, List[str]]:
     # LangChain returns AIMessage, not string
     text = response.content.strip()
     text = text.replace("```json", "").replace("```", "")
 
     try:
-        skills = json.loads(text)
+        return _json_loads(text)
     except Exception:
         # Fail-safe: never break pipeline
-        skills = {
-            "core_skills": [],
-            "tools": [],
-            "domain_skills": []
-        }
+        return _empty_skills()
 
-    return skills
 
+def extract_skills_llm(
+    resume_text: str,
+    role_context: str | None = None
+) -> Dict[str, List[str]]:
+    """
+    Extracts structured skills using LLM.
+    Optionally conditions extraction on job role.
+    """
+    response = call_llm(_build_skill_prompt(resume_text, role_context))
+    return _parse_skills(response)
 
-def extract_section(text: str, keywords: List[str]) -> str:
+
+def extract_skills_bulk(
+    resume_texts: List[str],
+    role_context: str | None = None
+) -> List[Dict[str, List[str]]]:
     """
-    Heuristic section extraction (experience/projects/etc.)
+    Extracts skills for many resumes with concurrent LLM calls.
+    Returns one skills dict per resume, in input order; a one-off
+    failed call yields empty skill lists for that resume only.
+
+    Raises:
+        RuntimeError: If calls are still rate-limited after all keys.
+        Exception: The first error, if every call in the batch failed
+            (e.g. a bad API key), rather than ranking on empty skills.
     """
-    lines = text.splitlines()
-    collected = []
-    capture = False
+    prompts = [_build_skill_prompt(t, role_context) for t in resume_texts]
+    responses = call_llm_batch(prompts)
+
+    if responses and all(isinstance(r, Exception) for r in responses):
+        raise responses[0]
+
+    return [
+        _empty_skills() if isinstance(r, Exception) else _parse_skills(r)
+        for r in responses
+    ]
 
-    for line in lines:
-        lower = line.lower()
 
-        if any(k in lower for k in keywords):
-            capture = True
-            continue
+@lru_cache(maxsize=32)
+def _section_re(keywords: Tuple[str, ...]) -> re.Pattern:
+    """
+    Compile (once per keyword set) a pattern matching the first line that
+    mentions any keyword, capturing the non-blank lines right after it.
+    """
+    alternation = "|".join(map(re.escape, keywords))
+    return re.compile(
+        r"^[^\n]*(?:" + alternation + r")[^\n]*\n"
+        r"((?:[^\S\n]*\S[^\n]*(?:\n|$))*)",
+        re.IGNORECASE | re.MULTILINE,
+    )
 
-        if capture:
-            if not lower.strip():
-                break
-            collected.append(line)
 
-    return "\n".join(collected).strip()
+@lru_cache(maxsize=32)
+def _keyword_re(keywords: Tuple[str, ...]) -> re.Pattern:
+    """
+    Compile (once per keyword set) a pattern matching any keyword.
+    """
+    return re.compile("|".join(map(re.escape, keywords)), re.IGNORECASE)
+
+
+# Every line boundary str.splitlines() recognises, other than "\n" itself
+_LINE_BREAK_RE = re.compile(r"\r\n|[\r\v\f\x1c-\x1e\x85\u2028\u2029]")
+
+
+def extract_section(text: str, keywords: List[str]) -> str:
+    """
+    Heuristic section extraction (experience/projects/etc.)
+    """
+    # Normalise line endings first so the section comes back "\n"-joined
+    text = _LINE_BREAK_RE.sub("\n", text)
+    match = _section_re(tuple(keywords)).search(text)
+    if not match:
+        return ""
+
+    section = match.group(1)
+    # Later keyword lines inside the section are skipped, not captured
+    if _keyword_re(tuple(keywords)).search(section):
+        section = "\n".join(
+            line for line in section.split("\n")
+            if not any(k in line.lower() for k in keywords)
+        )
+    return section.strip()
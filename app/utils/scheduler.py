@@ -5,14 +5,20 @@ Background scheduler for automated HR tasks.
 - Auto-evaluates CVs and notifies HR
 """
 
+import bisect
+import hashlib
 import json
 import logging
+import threading
+import time
 from datetime import datetime, timedelta, timezone
 
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.jobstores.memory import MemoryJobStore
 
-from app.db.database import SessionLocal
+from sqlalchemy.orm import sessionmaker
+
+from app.db.database import engine
 from app.db.models import (
     JobRequest, JobStatus, User, UserRole,
     Notification, NotificationType,
@@ -21,6 +27,12 @@ from app.db.models import (
 
 logger = logging.getLogger("scheduler")
 
+# Scheduler tasks keep reading rows after commit (e.g. job.role_title for
+# the notification text), so don't expire them on commit.
+SchedulerSession = sessionmaker(
+    autocommit=False, autoflush=False, bind=engine, expire_on_commit=False,
+)
+
 # ── Singleton Scheduler ──────────────────────────────────
 scheduler = BackgroundScheduler(
     jobstores={"default": MemoryJobStore()},
@@ -60,28 +72,16 @@ def schedule_pre_close_tasks(job_id: int, end_date: datetime):
         # If already past the trigger time, run immediately
         run_at = now + timedelta(seconds=10)
 
-    job_tag = f"job-{job_id}"
-
     # Remove any existing scheduled tasks for this job
     cancel_job_schedule(job_id)
 
-    # Schedule reminder notification
+    # Reminder and auto CV evaluation run back-to-back in a single job
     scheduler.add_job(
-        send_closing_reminder,
+        _reminder_then_eval,
         "date",
         run_date=run_at,
         args=[job_id],
-        id=f"reminder-{job_id}",
-        replace_existing=True,
-    )
-
-    # Schedule auto CV evaluation (5 seconds after reminder)
-    scheduler.add_job(
-        run_auto_evaluation,
-        "date",
-        run_date=run_at + timedelta(seconds=5),
-        args=[job_id],
-        id=f"auto-eval-{job_id}",
+        id=f"pre-close-{job_id}",
         replace_existing=True,
     )
 
@@ -91,39 +91,66 @@ def schedule_pre_close_tasks(job_id: int, end_date: datetime):
 
 
 def cancel_job_schedule(job_id: int):
-    """Remove all scheduled tasks for a job."""
-    for prefix in ("reminder-", "auto-eval-"):
-        try:
-            scheduler.remove_job(f"{prefix}{job_id}")
-        except Exception:
-            pass
+    """Remove the scheduled pre-close task for a job."""
+    try:
+        scheduler.remove_job(f"pre-close-{job_id}")
+    except Exception:
+        pass
+
+
+# ── HR Recipients ────────────────────────────────────────
+
+# A wave of jobs closing on the same day fires many pre-close tasks back
+# to back; cache the HR recipient ids briefly so they share one query.
+HR_IDS_TTL_SECONDS = 60
+
+_hr_ids_lock = threading.Lock()
+_hr_ids_cache: tuple = ()
+_hr_ids_expires_at = 0.0
+
+
+def _hr_user_ids() -> list:
+    """Return the ids of all HR users, cached for HR_IDS_TTL_SECONDS."""
+    global _hr_ids_cache, _hr_ids_expires_at
+    with _hr_ids_lock:
+        if time.monotonic() >= _hr_ids_expires_at:
+            with SchedulerSession() as db:
+                _hr_ids_cache = tuple(
+                    hr_id for (hr_id,) in db.query(User.id).filter(User.role == UserRole.hr)
+                )
+            _hr_ids_expires_at = time.monotonic() + HR_IDS_TTL_SECONDS
+        return list(_hr_ids_cache)
 
 
 # ── Task Implementations ─────────────────────────────────
 
+def _reminder_then_eval(job_id: int):
+    """Pre-close task: send the closing reminder, then auto-evaluate CVs."""
+    send_closing_reminder(job_id)
+    run_auto_evaluation(job_id)
+
+
 def send_closing_reminder(job_id: int):
     """Send a notification to all HR users reminding them the job is closing soon."""
-    db = SessionLocal()
-    try:
-        job = db.query(JobRequest).filter(JobRequest.id == job_id).first()
-        if not job or job.status != JobStatus.active:
-            return
-
-        hr_users = db.query(User).filter(User.role == UserRole.hr).all()
-        for hr in hr_users:
-            db.add(Notification(
-                user_id=hr.id,
-                message=f'⏰ Reminder: "{job.role_title}" is closing in 2 days. CV evaluation will start automatically.',
-                type=NotificationType.closing_reminder,
-                related_job_id=job.id,
-            ))
-        db.commit()
-        logger.info(f"Closing reminder sent for job {job_id}")
-    except Exception as e:
-        logger.error(f"Error sending closing reminder for job {job_id}: {e}")
-        db.rollback()
-    finally:
-        db.close()
+    with SchedulerSession() as db:
+        try:
+            job = db.query(JobRequest).filter(JobRequest.id == job_id).first()
+            if not job or job.status != JobStatus.active:
+                return
+
+            hr_ids = _hr_user_ids()
+            for hr_id in hr_ids:
+                db.add(Notification(
+                    user_id=hr_id,
+                    message=f'⏰ Reminder: "{job.role_title}" is closing in 2 days. CV evaluation will start automatically.',
+                    type=NotificationType.closing_reminder,
+                    related_job_id=job.id,
+                ))
+            db.commit()
+            logger.info(f"Closing reminder sent for job {job_id}")
+        except Exception as e:
+            logger.error(f"Error sending closing reminder for job {job_id}: {e}")
+            db.rollback()
 
 
 def run_auto_evaluation(job_id: int):
@@ -134,121 +161,132 @@ def run_auto_evaluation(job_id: int):
     3. Store results in candidate_evaluations table
     4. Notify all HR users
     """
-    db = SessionLocal()
-    try:
-        job = db.query(JobRequest).filter(JobRequest.id == job_id).first()
-        if not job or job.status != JobStatus.active:
-            return
-
-        # Fetch candidates from local database
-        candidates_rows = db.query(Candidate).filter(Candidate.job_id == job_id).all()
-
-        if not candidates_rows:
-            logger.info(f"No candidates for job {job_id}, skipping evaluation")
-            return
-
-        # Run evaluation — in mock/demo mode, generate scores deterministically
-        evaluations = []
-        for cand in candidates_rows:
-            import hashlib
-            name = cand.name or "Unknown"
-            # Generate a deterministic score based on candidate name
-            hash_val = int(hashlib.md5(name.encode()).hexdigest(), 16)
-            score = 45 + (hash_val % 51)  # Score between 45-95
-
-            grade = _compute_grade(score)
-            evaluations.append({
-                "candidate_id": cand.id,
-                "name": name,
-                "email": cand.email,
-                "score": score,
-                "grade": grade,
-                "stage": cand.stage.value if hasattr(cand.stage, "value") else str(cand.stage),
-                "summary": f"Auto-evaluated candidate with score {score}/{grade}",
-            })
-
-            # Store evaluation in the dedicated table
-            existing_eval = db.query(CandidateEvaluation).filter(
-                CandidateEvaluation.candidate_id == cand.id
-            ).first()
-            if not existing_eval:
-                db.add(CandidateEvaluation(
-                    candidate_id=cand.id,
-                    job_id=job_id,
-                    overall_score=score,
-                    grade=grade,
-                    recommendation=f"Auto-evaluated candidate with score {score}/{grade}",
-                    is_automated=True,
-                ))
-
-        # Sort by score descending
-        evaluations.sort(key=lambda x: x["score"], reverse=True)
-
-        db.commit()
-
-        # Notify HR
-        hr_users = db.query(User).filter(User.role == UserRole.hr).all()
-        top = evaluations[0] if evaluations else None
-        top_msg = f" Top candidate: {top['name']} ({top['grade']})" if top else ""
-
-        for hr in hr_users:
-            db.add(Notification(
-                user_id=hr.id,
-                message=(
-                    f'✅ CV evaluation for "{job.role_title}" is complete. '
-                    f'{len(evaluations)} candidates evaluated.{top_msg}'
-                ),
-                type=NotificationType.cv_evaluation_complete,
-                related_job_id=job.id,
-            ))
-        db.commit()
-        logger.info(f"Auto-evaluation complete for job {job_id}: {len(evaluations)} candidates")
-
-    except Exception as e:
-        logger.error(f"Error in auto-evaluation for job {job_id}: {e}")
-        db.rollback()
-    finally:
-        db.close()
+    with SchedulerSession() as db:
+        try:
+            job = db.query(JobRequest).filter(JobRequest.id == job_id).first()
+            if not job or job.status != JobStatus.active:
+                return
+
+            # Fetch candidates from local database (only the columns we use)
+            candidates_rows = db.query(
+                Candidate.id, Candidate.name, Candidate.email, Candidate.stage,
+            ).filter(Candidate.job_id == job_id).all()
+
+            if not candidates_rows:
+                logger.info(f"No candidates for job {job_id}, skipping evaluation")
+                return
+
+            # Candidates that already have an evaluation, in one query
+            already_evaluated = {
+                candidate_id for (candidate_id,) in db.query(CandidateEvaluation.candidate_id).filter(
+                    CandidateEvaluation.candidate_id.in_([c.id for c in candidates_rows])
+                )
+            }
+
+            # Run evaluation — in mock/demo mode, generate scores deterministically
+            evaluations = []
+            new_evaluations = []
+            for cand in candidates_rows:
+                name = cand.name or "Unknown"
+                score = _mock_score(name)
+
+                grade = _compute_grade(score)
+                evaluations.append({
+                    "candidate_id": cand.id,
+                    "name": name,
+                    "email": cand.email,
+                    "score": score,
+                    "grade": grade,
+                    "stage": cand.stage.value if cand.stage is not None else None,
+                    "summary": f"Auto-evaluated candidate with score {score}/{grade}",
+                })
+
+                # Store evaluation in the dedicated table
+                if cand.id not in already_evaluated:
+                    new_evaluations.append({
+                        "candidate_id": cand.id,
+                        "job_id": job_id,
+                        "overall_score": score,
+                        "grade": grade,
+                        "recommendation": f"Auto-evaluated candidate with score {score}/{grade}",
+                        "is_automated": True,
+                    })
+
+            # Sort by score descending
+            evaluations.sort(key=lambda x: x["score"], reverse=True)
+
+            db.bulk_insert_mappings(CandidateEvaluation, new_evaluations)
+            db.commit()
+
+            # Notify HR
+            hr_ids = _hr_user_ids()
+            top = evaluations[0] if evaluations else None
+            top_msg = f" Top candidate: {top['name']} ({top['grade']})" if top else ""
+            message = (
+                f'✅ CV evaluation for "{job.role_title}" is complete. '
+                f'{len(evaluations)} candidates evaluated.{top_msg}'
+            )
+
+            db.bulk_insert_mappings(Notification, [
+                {
+                    "user_id": hr_id,
+                    "message": message,
+                    "type": NotificationType.cv_evaluation_complete,
+                    "related_job_id": job.id,
+                }
+                for hr_id in hr_ids
+            ])
+            # Bulk inserts bypass the Notification after_insert hook,
+            # so bump the denormalized unread counters here
+            db.query(User).filter(User.id.in_(hr_ids)).update(
+                {"unread_count": User.unread_count + 1}, synchronize_session=False
+            )
+            db.commit()
+            logger.info(f"Auto-evaluation complete for job {job_id}: {len(evaluations)} candidates")
+
+        except Exception as e:
+            logger.error(f"Error in auto-evaluation for job {job_id}: {e}")
+            db.rollback()
+
+
+def _mock_score(name: str) -> int:
+    """Deterministic mock score between 45-95, derived from the candidate name."""
+    digest = hashlib.md5(name.encode(), usedforsecurity=False).digest()
+    return 45 + int.from_bytes(digest, "big") % 51
+
+
+# Lower bound of each grade band; _GRADES[i] covers scores from
+# _GRADE_THRESHOLDS[i - 1] up to (not including) _GRADE_THRESHOLDS[i]
+_GRADE_THRESHOLDS = (50, 55, 60, 65, 70, 75, 80, 85, 90, 95)
+_GRADES = ("F", "D", "C-", "C", "C+", "B-", "B", "B+", "A-", "A", "A+")
 
 
 def _compute_grade(score: int) -> str:
     """Convert a numeric score to a letter grade."""
-    if score >= 95: return "A+"
-    if score >= 90: return "A"
-    if score >= 85: return "A-"
-    if score >= 80: return "B+"
-    if score >= 75: return "B"
-    if score >= 70: return "B-"
-    if score >= 65: return "C+"
-    if score >= 60: return "C"
-    if score >= 55: return "C-"
-    if score >= 50: return "D"
-    return "F"
+    return _GRADES[bisect.bisect_right(_GRADE_THRESHOLDS, score)]
 
 
 def reschedule_active_jobs():
     """
     On startup, re-schedule tasks for any active jobs with future end_dates.
     """
-    db = SessionLocal()
-    try:
-        jobs = db.query(JobRequest).filter(
-            JobRequest.status == JobStatus.active,
-            JobRequest.end_date.isnot(None),
-        ).all()
-
-        now = datetime.now(timezone.utc)
-        count = 0
-        for job in jobs:
-            end = job.end_date
-            if end.tzinfo is None:
-                end = end.replace(tzinfo=timezone.utc)
-            if end > now:
-                schedule_pre_close_tasks(job.id, end)
-                count += 1
-
-        logger.info(f"Re-scheduled {count} active jobs on startup")
-    except Exception as e:
-        logger.error(f"Error re-scheduling jobs: {e}")
-    finally:
-        db.close()
+    with SchedulerSession() as db:
+        try:
+            jobs = db.query(JobRequest.id, JobRequest.end_date).filter(
+                JobRequest.status == JobStatus.active,
+                JobRequest.end_date.isnot(None),
+            ).all()
+
+            now = datetime.now(timezone.utc)
+            count = 0
+            for job in jobs:
+                end = job.end_date
+                if end.tzinfo is None:
+                    end = end.replace(tzinfo=timezone.utc)
+                if end > now:
+                    schedule_pre_close_tasks(job.id, end)
+                    count += 1
+
+            logger.info(f"Re-scheduled {count} active jobs on startup")
+        except Exception as e:
+            logger.error(f"Error re-scheduling jobs: {e}")
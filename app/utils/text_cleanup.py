@@ -1,76 +1,396 @@
+import mmap
+import multiprocessing
 import os
-import pdfplumber
-from docx import Document
+import threading
+import xml.etree.ElementTree as ET
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator, List, Optional, Tuple
+
+# pypdfium2 is much faster than pdfplumber for plain text; fall back to
+# pdfplumber alone if it isn't installed
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+
+
+# --------------------------------------------------
+# Shared extraction pool
+# --------------------------------------------------
+# One long-lived process pool, created on first use. Its workers come
+# from a forkserver (spawn where that isn't available) instead of being
+# forked from the server process, which is already running scheduler
+# and threadpool threads.
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+# True inside pool workers; they extract sequentially instead of
+# handing nested work back to a pool
+_in_pool_worker = False
+
+
+def _init_pool_worker() -> None:
+    global _in_pool_worker
+    _in_pool_worker = True
+
+
+# Cap on extraction worker processes. Each holds its own PDFium state,
+# so memory-limited instances want few; override with the env var.
+MAX_EXTRACTION_WORKERS = int(os.getenv("TEXT_EXTRACTION_WORKERS", "4"))
+
+
+def _pool_size() -> int:
+    # sched_getaffinity honours the CPUs a container is actually given;
+    # os.cpu_count() reports the whole host
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # not available on macOS/Windows
+        cpus = os.cpu_count() or 1
+    return max(1, min(cpus, MAX_EXTRACTION_WORKERS))
+
+
+def _get_max_workers(n_tasks: int) -> int:
+    return min(_pool_size(), n_tasks)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            method = (
+                "forkserver" if "forkserver" in multiprocessing.get_all_start_methods()
+                else "spawn"
+            )
+            _pool = ProcessPoolExecutor(
+                max_workers=_pool_size(),
+                mp_context=multiprocessing.get_context(method),
+                initializer=_init_pool_worker,
+            )
+        return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    """Drop a broken pool so the next caller starts a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_extraction_pool() -> None:
+    """Stop the shared extraction pool's workers, if it was ever started."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+# --------------------------------------------------
+# PDF backends
+# --------------------------------------------------
+# Below this many pages a PDF is read in-process; a typical one- or
+# two-page resume isn't worth the round trip to the pool
+PARALLEL_MIN_PAGES = 4
+
+# Most pages handed to each pool worker at a time
+PAGE_BLOCK_SIZE = 16
+
+
+def _pdfium_page_text(pdf, page_index: int) -> str:
+    page = pdf[page_index]
+    textpage = page.get_textpage()
+    try:
+        # Image-only (scanned) pages have no text layer; skip the read
+        page_text = textpage.get_text_range() if textpage.count_chars() else ""
+    finally:
+        textpage.close()
+        page.close()
+    # PDFium separates lines with \r\n
+    return page_text.replace("\r\n", "\n")
+
+
+def _extract_page_range(file_path: str, start: int, end: int) -> str:
+    """Pool worker: open the PDF once and read pages [start, end)."""
+    pdf = pdfium.PdfDocument(file_path)
+    try:
+        return "\n".join(
+            t for t in (_pdfium_page_text(pdf, i) for i in range(start, end)) if t
+        )
+    finally:
+        pdf.close()
+
+
+def _extract_pdf_pdfium(file_path: str) -> str:
+    pdf = pdfium.PdfDocument(file_path)
+    try:
+        n_pages = len(pdf)
+        # Inside a pool worker the cores are already busy
+        parallel = n_pages >= PARALLEL_MIN_PAGES and not _in_pool_worker
+        if not parallel:
+            text = [_pdfium_page_text(pdf, i) for i in range(n_pages)]
+    finally:
+        pdf.close()
+
+    if parallel:
+        # Hand each worker a block of pages so the file is opened and its
+        # xref parsed once per block rather than once per page
+        # (smaller blocks for short PDFs, so every core still gets work)
+        block = min(PAGE_BLOCK_SIZE, -(-n_pages // _pool_size()))
+        starts = range(0, n_pages, block)
+        ends = [min(start + block, n_pages) for start in starts]
+        # Text extraction is CPU-bound in PDFium, so use processes, not threads
+        pool = _get_pool()
+        try:
+            text = list(pool.map(
+                _extract_page_range, [file_path] * len(starts), starts, ends,
+            ))
+        except BrokenProcessPool:
+            _discard_pool(pool)
+            text = [_extract_page_range(file_path, a, b) for a, b in zip(starts, ends)]
+
+    return "\n".join(t for t in text if t).strip()
+
+
+def _extract_pdf_pdfplumber(file_path: str) -> str:
+    # Imported on first use: pdfminer.six is heavy and only needed for
+    # the fallback path
+    import pdfplumber
+
+    text = []
+    with pdfplumber.open(file_path) as pdf:
+        for page in pdf.pages:
+            # Plain text stream only: no layout reconstruction, and no
+            # touching page.chars/objects (an image-only page yields "")
+            page_text = page.extract_text(layout=False)
+            # Drop each page's parsed objects as soon as it is read
+            page.close()
+            if page_text:
+                text.append(page_text)
+    return "\n".join(text).strip()
+
+
+def _extract_pdf(file_path: str) -> str:
+    if pdfium is not None:
+        text = _extract_pdf_pdfium(file_path)
+        if text:
+            return text
+    # No pypdfium2, or it found no text layer — let pdfplumber try
+    return _extract_pdf_pdfplumber(file_path)
+
+
+# --------------------------------------------------
+# DOCX backend
+# --------------------------------------------------
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_DOCX_TEXT = {_W + "tab": "\t", _W + "br": "\n", _W + "cr": "\n"}
+
+
+def _extract_docx(file_path: str) -> str:
+    """
+    Stream paragraph text straight out of word/document.xml instead of
+    building a python-docx Document for the whole file.
+    """
+    parts = []
+    with zipfile.ZipFile(file_path) as z, z.open("word/document.xml") as f:
+        for _, el in ET.iterparse(f, events=("end",)):
+            if el.tag != _W + "p":
+                continue
+            text = "".join(
+                (node.text or "") if node.tag == _W + "t" else _DOCX_TEXT.get(node.tag, "")
+                for node in el.iter()
+            ).strip()
+            if text:
+                parts.append(text)
+            # Free the paragraph's subtree once its text is taken
+            el.clear()
+    return "\n".join(parts)
+
+
+# --------------------------------------------------
+# TXT backend
+# --------------------------------------------------
+# Text files at least this big are mapped into memory rather than read
+MMAP_MIN_BYTES = 4 * 1024 * 1024
+
+
+def _extract_txt(file_path: str) -> str:
+    # One fstat + one read + one decode, instead of TextIOWrapper's
+    # chunked reads and incremental decoding
+    fd = os.open(file_path, os.O_RDONLY)
+    try:
+        size = os.fstat(fd).st_size
+        if size >= MMAP_MIN_BYTES:
+            with mmap.mmap(fd, size, access=mmap.ACCESS_READ) as mm:
+                data = mm[:]
+        else:
+            data = os.read(fd, size)
+    finally:
+        os.close(fd)
+
+    text = data.decode("utf-8", errors="ignore")
+    # Keep the universal-newline behaviour of text-mode open()
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text.strip()
 
 
 # --------------------------------------------------
 # 1️⃣ Extract raw text from file
 # --------------------------------------------------
+_EXTRACTORS = {
+    ".pdf": _extract_pdf,
+    ".doc": _extract_docx,
+    ".docx": _extract_docx,
+    ".txt": _extract_txt,
+}
+
+
 def extract_text_from_file(file_path: str) -> str:
     """
     Extract text from PDF, DOCX, or TXT files.
     """
     ext = os.path.splitext(file_path)[1].lower()
 
-    if ext == ".pdf":
-        text = []
-        with pdfplumber.open(file_path) as pdf:
-            for page in pdf.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text.append(page_text)
-        return "\n".join(text).strip()
-
-    elif ext in [".doc", ".docx"]:
-        doc = Document(file_path)
-        return "\n".join(
-            p.text.strip() for p in doc.paragraphs if p.text.strip()
-        )
+    extractor = _EXTRACTORS.get(ext)
+    if extractor is None:
+        raise ValueError(f"Unsupported file type: {ext}")
+    return extractor(file_path)
 
-    elif ext == ".txt":
-        with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-            return f.read().strip()
 
-    else:
-        raise ValueError(f"Unsupported file type: {ext}")
+def _extract_for_dir(file_path: str) -> str:
+    """Pool worker for extract_texts_from_dir."""
+    return _EXTRACTORS[os.path.splitext(file_path)[1].lower()](file_path)
+
+
+def _scan_supported(root: str) -> List[str]:
+    """Supported files under root, in os.walk (top-down) order."""
+    paths, subdirs = [], []
+    with os.scandir(root) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+            elif os.path.splitext(entry.name)[1].lower() in _EXTRACTORS:
+                paths.append(entry.path)
+    for subdir in subdirs:
+        paths.extend(_scan_supported(subdir))
+    return paths
+
+
+def extract_texts_from_dir(root: str) -> Iterator[Tuple[str, str]]:
+    """
+    Extract text from every supported file under root, one file per
+    worker process. Yields (path, text) in discovery order as each
+    result becomes available.
+    """
+    paths = _scan_supported(root)
+    if len(paths) < 2:
+        for path in paths:
+            yield path, extract_text_from_file(path)
+        return
+
+    workers = _get_max_workers(len(paths))
+    chunksize = max(1, len(paths) // (4 * workers))
+    pool = _get_pool()
+    done = 0
+    try:
+        for path, text in zip(paths, pool.map(_extract_for_dir, paths, chunksize=chunksize)):
+            yield path, text
+            done += 1
+    except BrokenProcessPool:
+        # A worker died; finish the remaining files in-process rather
+        # than losing the whole upload
+        _discard_pool(pool)
+        for path in paths[done:]:
+            yield path, extract_text_from_file(path)
 
 
 # --------------------------------------------------
 # 2️⃣ Cleanup helper
 # --------------------------------------------------
+BULLET = "•"
+
+
+def _iter_lines(text: str):
+    """Yield the lines of text one at a time, like text.split("\\n") lazily."""
+    start = 0
+    while True:
+        nl = text.find("\n", start)
+        if nl < 0:
+            yield text[start:]
+            return
+        yield text[start:nl]
+        start = nl + 1
+
+
+def _more_words_than(line: str, start: int, limit: int) -> bool:
+    """
+    True if line[start:] holds more than `limit` whitespace-separated
+    words. Stops counting as soon as the limit is passed, and builds no
+    word list.
+    """
+    count = 0
+    in_word = False
+    for i in range(start, len(line)):
+        if line[i] == BULLET:
+            continue  # inline bullets are dropped, as in the merge below
+        if line[i].isspace():
+            in_word = False
+        elif not in_word:
+            count += 1
+            if count > limit:
+                return True
+            in_word = True
+    return False
+
+
 def merge_short_bullets(text: str, min_words: int = 4) -> str:
     """
     Merge consecutive short bullet points into a single bullet.
     Helps LLMs understand fragmented responsibilities.
     """
-    lines = text.split("\n")
-    merged = []
-    buffer = None
+    if BULLET not in text:
+        return text  # nothing to merge
 
-    for line in lines:
-        stripped = line.strip()
+    # Merging only ever shrinks the line count, so size the output up front
+    merged = [None] * (text.count("\n") + 1)
+    out = 0
+    buffer = []  # short bullets waiting to be merged
 
-        if stripped.startswith("•"):
-            words = stripped.replace("•", "").strip().split()
+    for line in _iter_lines(text):
+        # Find the first non-whitespace character without copying the line
+        i, n = 0, len(line)
+        while i < n and line[i].isspace():
+            i += 1
 
-            if len(words) <= min_words:
-                if buffer:
-                    buffer += " and " + " ".join(words)
-                else:
-                    buffer = " ".join(words)
+        if i < n and line[i] == BULLET:
+            if not _more_words_than(line, i + 1, min_words):
+                # Inline "•" separators ("• Python • Java") are dropped too
+                words = line[i + 1:].replace(BULLET, "").split()
+                if words:  # an empty bullet line adds nothing to the merge
+                    buffer.append(" ".join(words))
             else:
                 if buffer:
-                    merged.append(f"• {buffer}")
-                    buffer = None
-                merged.append(stripped)
+                    merged[out] = BULLET + " " + " and ".join(buffer)
+                    out += 1
+                    buffer = []
+                merged[out] = line[i:].rstrip()
+                out += 1
 
         else:
             if buffer:
-                merged.append(f"• {buffer}")
-                buffer = None
-            merged.append(line)
+                merged[out] = BULLET + " " + " and ".join(buffer)
+                out += 1
+                buffer = []
+            merged[out] = line
+            out += 1
 
     if buffer:
-        merged.append(f"• {buffer}")
+        merged[out] = BULLET + " " + " and ".join(buffer)
+        out += 1
 
+    del merged[out:]
     return "\n".join(merged)
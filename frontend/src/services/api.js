@@ -372,7 +372,7 @@ export async function listKekaCandidates(kekaJobId) {
     return res.json();
 }
 
-export async function importKekaCandidates(kekaJobId, localJobId, candidateIds = null) {
+export async function importKekaCandidates(kekaJobId, localJobId, candidateIds = null, onProgress = null) {
     const res = await authFetch(`/keka/import-candidates/${kekaJobId}`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
@@ -381,5 +381,74 @@ export async function importKekaCandidates(kekaJobId, localJobId, candidateIds =
             candidate_ids: candidateIds,
         }),
     });
-    return res.json();
+    const { job_id } = await res.json();
+    return waitForKekaImport(job_id, onProgress);
+}
+
+const KEKA_IMPORT_DONE = ['completed', 'failed'];
+const KEKA_IMPORT_MAX_RECONNECTS = 5;
+
+// Read one connection of the import-status SSE stream, reporting every
+// state it carries. Resolves with the last state seen (or null).
+async function readKekaImportStream(jobId, onProgress) {
+    const res = await authFetch(`/keka/import-status/${jobId}`, {
+        headers: { Accept: 'text/event-stream' },
+    });
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffered = '';
+    let state = null;
+
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffered += decoder.decode(value, { stream: true });
+
+        const events = buffered.split('\n\n');
+        buffered = events.pop();
+        for (const event of events) {
+            // Comment lines (": ping") are heartbeats and carry no data
+            const data = event.split('\n')
+                .filter(line => line.startsWith('data:'))
+                .map(line => line.slice(5).trim())
+                .join('');
+            if (!data) continue;
+            state = JSON.parse(data);
+            if (onProgress) onProgress(state);
+        }
+    }
+    return state;
+}
+
+// Follow the import-status SSE stream until the import finishes,
+// reconnecting if the connection drops (e.g. a proxy timeout) first.
+// Resolves with the final { status, imported, skipped, errors, candidates }.
+export async function waitForKekaImport(jobId, onProgress = null) {
+    let state = null;
+    let reconnects = 0;
+
+    while (!state || !KEKA_IMPORT_DONE.includes(state.status)) {
+        if (reconnects > KEKA_IMPORT_MAX_RECONNECTS) {
+            throw new Error('Import status stream closed before the import finished');
+        }
+        let latest = null;
+        try {
+            latest = await readKekaImportStream(jobId, onProgress);
+        } catch (err) {
+            // Dropped connections surface as network TypeErrors; HTTP
+            // errors (404, expired session) are final
+            if (!(err instanceof TypeError)) throw err;
+        }
+        if (latest) {
+            state = latest;
+            reconnects = 0;
+        } else {
+            reconnects += 1;
+        }
+    }
+
+    if (state.status === 'failed' && state.imported === 0) {
+        throw new Error(state.errors?.[0] || 'Import failed');
+    }
+    return state;
 }